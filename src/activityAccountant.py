@@ -1,4 +1,7 @@
 import pandas as pd
+from pandas.io.parsers import TextParser
+import openpyxl
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
 import os
 import math
 import datetime as dt
@@ -18,6 +21,42 @@ OLDEST_REGISTRANT_ALLOWED = dt.datetime(
 )
 # Overwritten by "now" in code if earlier than now.
 LATEST_EVENT_END_DATE = pd.to_datetime("2025/03/17")
+# If set, registrant exports are read this many rows at a time instead of all
+# at once, so peak memory is bounded by the chunk size rather than the file.
+REGISTRANT_CHUNK_SIZE = int(os.environ.get("REGISTRANT_CHUNK_SIZE") or 0) or None
+# Registrant exports are read without type inference, so each cell keeps the
+# value excel gave it (e.g. a name of "0042" stays text). Otherwise pandas
+# would guess column types from whatever rows it happens to see, and chunked
+# and full reads could disagree.
+REGISTRANT_DTYPE = object
+
+
+def isSpreadsheetFile(file):
+    # Skip non-excel files, and the lock files excel leaves lying around
+    return file.endswith(".xlsx") and not file.startswith("~")
+
+
+def convertCell(cell):
+    # Convert an openpyxl cell the same way pandas.read_excel does, so that
+    # chunked reads produce the same values as full reads.
+    if cell.value is None:
+        return ""
+    elif cell.data_type == TYPE_ERROR:
+        return math.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+
+def parseRows(header, rows, dtype=None):
+    # Build a DataFrame from raw rows, padding them out to a common width
+    # (as pandas.read_excel does) so missing trailing cells come out as NaN.
+    width = max(len(row) for row in [header] + rows)
+    data = [row + [""] * (width - len(row)) for row in [header] + rows]
+    return TextParser(data, header=0, skip_blank_lines=False, dtype=dtype).read()
 
 
 class Event:
@@ -59,11 +98,27 @@ class Registrant:
 
 
 class Accountant:
-    def __init__(self, inputDir, outputDir):
+    def __init__(
+        self,
+        inputDir,
+        outputDir,
+        chunkSize=None,
+        maximumEventAge=None,
+        oldestRegistrantAllowed=None,
+        latestEventEndDate=None,
+    ):
         self.userMap = dict()
         self.eventMap = dict()
         self.inputBaseDir = inputDir
         self.outputBaseDir = outputDir
+        self.chunkSize = chunkSize or REGISTRANT_CHUNK_SIZE
+        # The date window defaults to the module settings, but can be set per
+        # accountant (e.g. when scoring several organizations in one process)
+        self.maximumEventAge = maximumEventAge or MAXIMUM_EVENT_AGE
+        self.oldestRegistrantAllowed = (
+            oldestRegistrantAllowed or OLDEST_REGISTRANT_ALLOWED
+        )
+        self.latestEventEndDate = latestEventEndDate or LATEST_EVENT_END_DATE
         self.aliases = dict()
         self.loadEmailAliases()
         self.buildEventList()
@@ -72,12 +127,12 @@ class Accountant:
         self.assignPoints()
 
     def eliminateOutdatedRegistrants(self):
-        # if your latest registration is older than OLDEST_REGISTRANT_ALLOWED,
+        # if your latest registration is older than oldestRegistrantAllowed,
         # then your record is thrown out.
         toDelete = list()
         for email, member in self.userMap.items():
             if pd.to_datetime(member.sourceEventDate) < pd.to_datetime(
-                OLDEST_REGISTRANT_ALLOWED
+                self.oldestRegistrantAllowed
             ):
                 toDelete.append(email)
         for email in toDelete:
@@ -203,8 +258,8 @@ class Accountant:
         for key in self.eventMap:
             print(self.eventMap[key].name)
 
-    def openAndValidateSheet(self, directory, file):
-        if (not file.endswith(".xlsx")) or file.startswith("~"):
+    def openAndValidateSheet(self, directory, file, dtype=None):
+        if not isSpreadsheetFile(file):
             return None
         spreadsheet = pd.ExcelFile(os.path.join(directory, file))
         sheetCount = spreadsheet.sheet_names.__len__()
@@ -212,16 +267,55 @@ class Accountant:
             raise Exception(
                 f"File {file} has {sheetCount} sheets, but we only support single-sheet XLSX files.\n"
             )
-        sheet = pd.read_excel(spreadsheet, spreadsheet.sheet_names[0])
+        sheet = pd.read_excel(spreadsheet, spreadsheet.sheet_names[0], dtype=dtype)
         return sheet
 
+    def iterSheetChunks(self, directory, file, chunkSize, dtype=None):
+        # Like openAndValidateSheet, but yields the sheet as a series of
+        # DataFrames of at most chunkSize rows, streaming the file with
+        # openpyxl's read-only mode so that only one chunk is in memory.
+        if not isSpreadsheetFile(file):
+            return
+        workbook = openpyxl.load_workbook(
+            os.path.join(directory, file), read_only=True, data_only=True
+        )
+        try:
+            sheetCount = workbook.sheetnames.__len__()
+            if sheetCount != 1:
+                raise Exception(
+                    f"File {file} has {sheetCount} sheets, but we only support single-sheet XLSX files.\n"
+                )
+            worksheet = workbook.worksheets[0]
+            worksheet.reset_dimensions()
+            header = None
+            rows = list()
+            for row in worksheet.iter_rows():
+                values = [convertCell(cell) for cell in row]
+                while values and values[-1] == "":
+                    # trim trailing empty cells
+                    values.pop()
+                if header is None:
+                    header = values
+                    continue
+                rows.append(values)
+                if rows.__len__() == chunkSize:
+                    yield parseRows(header, rows, dtype)
+                    rows = list()
+            # Trailing blank rows are dropped, as pandas does
+            while rows and not rows[-1]:
+                rows.pop()
+            if rows:
+                yield parseRows(header, rows, dtype)
+        finally:
+            workbook.close()
+
     def buildEventList(self):
         eventDir = os.path.join(self.inputBaseDir, EVENT_SUBDIR)
         currTime = pd.to_datetime("now")
-        # LATEST_EVENT_END_DATE can force us to let
+        # latestEventEndDate can force us to let
         # more events in, but it can't force us to leave out events that
         #  have finished
-        latestAllowedEventEndDate = LATEST_EVENT_END_DATE
+        latestAllowedEventEndDate = self.latestEventEndDate
         if latestAllowedEventEndDate is None or latestAllowedEventEndDate < currTime:
             latestAllowedEventEndDate = currTime
         for file in os.listdir(eventDir):
@@ -238,7 +332,7 @@ class Accountant:
                 if str(eventEndDate).startswith("0000"):
                     eventEndDate = sheet["event_date"].iloc[ndx]
                 eventEndDate = pd.to_datetime(eventEndDate)
-                if eventEndDate < (currTime - MAXIMUM_EVENT_AGE):
+                if eventEndDate < (currTime - self.maximumEventAge):
                     print(
                         f"***Event {eventName}'s end date is older than the maximum event age. It will not be counted."
                     )
@@ -261,60 +355,75 @@ class Accountant:
     def buildAttendeeList(self):
         registrantDir = os.path.join(self.inputBaseDir, REGISTRANT_SUBDIR)
         for file in os.listdir(registrantDir):
-            sheet = self.openAndValidateSheet(registrantDir, file)
-            if sheet is None:
+            if not isSpreadsheetFile(file):
                 continue
-            print(f"Processing Registrant Export {file}...")
-            for ndx in range(0, sheet.__len__()):
-                if sheet["Payment Status"].iloc[ndx] != "Paid":
-                    # Skip records that are cancelled or pending
-                    continue
-                eventId = int(sheet["Event ID"].iloc[ndx])
-                if eventId not in self.eventMap:
-                    # if the event for this registrant record isn't in our
-                    # list, ignore it.
-                    continue
-                memberId = sheet["User ID"].iloc[ndx]
-                group = None
-                if "Group: " in sheet:
-                    group = sheet["Group: "].iloc[ndx]
-                if group and str(group) != "" and str(group) != "nan":
-                    # If they're part of a group signup, the memberId
-                    # will be the person who signed everyone up. Omit
-                    # the ID and match on the other attributes
-                    memberId = 0
-                else:
-                    memberId = int(memberId)
-                attendee = self.getCreateOrUpdateUser(
-                    firstName=str(sheet["First Name"].iloc[ndx]),
-                    lastName=str(sheet["Last Name"].iloc[ndx]),
-                    email=str(sheet["Email"].iloc[ndx]),
-                    memberId=memberId,
-                    eventRecordDate=pd.Timestamp(self.eventMap[eventId].date),
+            if self.chunkSize:
+                chunks = self.iterSheetChunks(
+                    registrantDir, file, self.chunkSize, REGISTRANT_DTYPE
                 )
-                # Cull any registrations that were actually NoShowed.
-                if "Attendance" in sheet:
-                    val = sheet["Attendance"].iloc[ndx]
-                    if val and str(val) != "" and str(val) != "nan":
-                        tempstr = str(val)
-                        if str(val) == "NoShow":
-                            # Skip this registration...they didn't show up, so they get no points.
-                            continue
-                        else:
-                            raise Exception(
-                                f"The 'Attendance' field has an "
-                                + f"unexpected value in row {ndx}. It must be 'NoShow' or empty"
-                            )
-                # Apply a special multiplier if one exists. This is used for custom events,
-                # to give a user variable number of points for a single-point event
-                # (say, construction work)
-                multiplier = 1
-                if "multiplier" in sheet:
-                    val = sheet["multiplier"].iloc[ndx]
-                    if val and str(val) != "" and str(val) != "nan":
-                        multiplier = int(val)
-                # Mark the attendee for this event, with the specified multiplier
-                attendee.addEvent(int(sheet["Event ID"].iloc[ndx]), multiplier)
+            else:
+                chunks = [
+                    self.openAndValidateSheet(registrantDir, file, REGISTRANT_DTYPE)
+                ]
+            print(f"Processing Registrant Export {file}...")
+            rowOffset = 0
+            for sheet in chunks:
+                self.addRegistrations(sheet, rowOffset)
+                rowOffset += sheet.__len__()
+
+    def addRegistrations(self, sheet, rowOffset=0):
+        # Record the registrations in a registrant export, or a chunk of one
+        # starting at row rowOffset.
+        for ndx in range(0, sheet.__len__()):
+            if sheet["Payment Status"].iloc[ndx] != "Paid":
+                # Skip records that are cancelled or pending
+                continue
+            eventId = int(sheet["Event ID"].iloc[ndx])
+            if eventId not in self.eventMap:
+                # if the event for this registrant record isn't in our
+                # list, ignore it.
+                continue
+            memberId = sheet["User ID"].iloc[ndx]
+            group = None
+            if "Group: " in sheet:
+                group = sheet["Group: "].iloc[ndx]
+            if group and str(group) != "" and str(group) != "nan":
+                # If they're part of a group signup, the memberId
+                # will be the person who signed everyone up. Omit
+                # the ID and match on the other attributes
+                memberId = 0
+            else:
+                memberId = int(memberId)
+            attendee = self.getCreateOrUpdateUser(
+                firstName=str(sheet["First Name"].iloc[ndx]),
+                lastName=str(sheet["Last Name"].iloc[ndx]),
+                email=str(sheet["Email"].iloc[ndx]),
+                memberId=memberId,
+                eventRecordDate=pd.Timestamp(self.eventMap[eventId].date),
+            )
+            # Cull any registrations that were actually NoShowed.
+            if "Attendance" in sheet:
+                val = sheet["Attendance"].iloc[ndx]
+                if val and str(val) != "" and str(val) != "nan":
+                    tempstr = str(val)
+                    if str(val) == "NoShow":
+                        # Skip this registration...they didn't show up, so they get no points.
+                        continue
+                    else:
+                        raise Exception(
+                            f"The 'Attendance' field has an "
+                            + f"unexpected value in row {rowOffset + ndx}. It must be 'NoShow' or empty"
+                        )
+            # Apply a special multiplier if one exists. This is used for custom events,
+            # to give a user variable number of points for a single-point event
+            # (say, construction work)
+            multiplier = 1
+            if "multiplier" in sheet:
+                val = sheet["multiplier"].iloc[ndx]
+                if val and str(val) != "" and str(val) != "nan":
+                    multiplier = int(val)
+            # Mark the attendee for this event, with the specified multiplier
+            attendee.addEvent(int(sheet["Event ID"].iloc[ndx]), multiplier)
 
     def assignPoints(self):
         # iterate over events, and assign points to every user that has that event
@@ -0,0 +1,260 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import shutil
+import sys
+import time
+import traceback
+
+import pandas as pd
+
+import activityAccountant as aa
+import googleDriveClient as gd
+import updateScoresOnDrive as us
+
+# Scores several organizations in one go. The batch is described by a JSON
+# file holding a list of roots, one per organization:
+#
+# [
+#     {
+#         "name": "north",
+#         "driveFolder": "NorthActivityAccounting",
+#         "scoringFolder": "northScoring",
+#         "publicScoringFolder": "northScoringPublic",
+#         "oldestRegistrantAllowed": "2023-09-01 09:00",
+#         "latestEventEndDate": "2025-03-17",
+#         "maximumEventAgeYears": 3
+#     },
+#     {"name": "south", "localDir": "/data/south", "outputDir": "/data/south/out"}
+# ]
+#
+# Each root reads its input from either a Drive folder (driveFolder) or a
+# local directory (localDir). Results are always written locally (outputDir,
+# by default under the work dir) and are uploaded to Drive for Drive roots, or
+# for local roots that name a scoringFolder/publicScoringFolder. Any root that
+# uploads must name both folders, and no two roots may share an output folder
+# or outputDir. The date window settings are optional and default to those in
+# activityAccountant.py.
+#
+# Roots are scored concurrently in a process pool. Each worker builds one
+# Drive service and one folder metadata cache, shared by every root it scores.
+# A root that fails is reported in the summary without stopping the others.
+
+# Per-worker state, set up by initWorker
+workerRootUrl = None
+workerService = None
+workerCache = None
+
+
+def loadRoots(configPath):
+    with open(configPath) as f:
+        roots = json.load(f)
+    names = set()
+    # Output folder/directory -> the root that writes to it
+    outputs = dict()
+    for root in roots:
+        if "name" not in root:
+            raise Exception(f"Every root in {configPath} must have a name.")
+        name = root["name"]
+        if (
+            not isinstance(name, str)
+            or name in ["", ".", ".."]
+            or os.path.isabs(name)
+            or os.sep in name
+            or (os.altsep and os.altsep in name)
+        ):
+            # The name becomes a directory under the work dir, which we clear
+            # out before each run, so it must not point anywhere else.
+            raise Exception(
+                f"Root name '{name}' must be a plain directory name, without path separators."
+            )
+        if root["name"] in names:
+            raise Exception(f"Root name '{root['name']}' is used more than once.")
+        names.add(root["name"])
+        if ("driveFolder" in root) == ("localDir" in root):
+            raise Exception(
+                f"Root '{root['name']}' must have exactly one of 'driveFolder' or 'localDir'."
+            )
+        targets = list()
+        if uploadsResults(root):
+            # Every uploading root needs its own folders, or one organization's
+            # results would overwrite (or be shared with) another's.
+            for key in ["scoringFolder", "publicScoringFolder"]:
+                if key not in root:
+                    raise Exception(
+                        f"Root '{root['name']}' uploads its results, so it must set '{key}'."
+                    )
+                targets.append(("Drive folder", root[key]))
+        if "outputDir" in root:
+            targets.append(("output dir", os.path.abspath(root["outputDir"])))
+        for target in targets:
+            if target in outputs:
+                raise Exception(
+                    f"Roots '{outputs[target]}' and '{root['name']}' both write to "
+                    + f"{target[0]} '{target[1]}'. Every root needs its own outputs."
+                )
+            outputs[target] = root["name"]
+    return roots
+
+
+def uploadsResults(root):
+    return (
+        "driveFolder" in root or "scoringFolder" in root or "publicScoringFolder" in root
+    )
+
+
+def accountantOptions(root):
+    # Translate a root's settings into Accountant keyword arguments
+    options = dict()
+    if "registrantChunkSize" in root:
+        options["chunkSize"] = int(root["registrantChunkSize"])
+    if "maximumEventAgeYears" in root:
+        options["maximumEventAge"] = pd.DateOffset(years=root["maximumEventAgeYears"])
+    if "oldestRegistrantAllowed" in root:
+        options["oldestRegistrantAllowed"] = pd.to_datetime(
+            root["oldestRegistrantAllowed"]
+        )
+    if "latestEventEndDate" in root:
+        options["latestEventEndDate"] = pd.to_datetime(root["latestEventEndDate"])
+    return options
+
+
+def initWorker(rootUrl):
+    global workerRootUrl, workerService, workerCache
+    workerRootUrl = rootUrl
+    workerService = None
+    workerCache = dict()
+
+
+def getWorkerService():
+    # Only build the service once a root actually needs Drive, so that purely
+    # local batches don't need credentials.
+    global workerService
+    if workerService is None:
+        workerService = gd.createService(workerRootUrl)
+    return workerService
+
+
+def scoreRoot(root, workDir):
+    summary = {
+        "name": root["name"],
+        "status": "ok",
+        "events": None,
+        "registrants": None,
+        "results": list(),
+        "error": None,
+    }
+    start = time.perf_counter()
+    try:
+        localBaseDir = os.path.join(workDir, root["name"])
+        outputDir = root.get("outputDir")
+        if outputDir is None:
+            # Start from a clean results dir, as updateScoresOnDrive does
+            outputDir = os.path.join(localBaseDir, "results")
+            if os.path.isdir(outputDir):
+                shutil.rmtree(outputDir)
+        if "driveFolder" in root:
+            inputDir = os.path.join(localBaseDir, "input")
+            if os.path.isdir(inputDir):
+                shutil.rmtree(inputDir)
+            rootDirId = gd.getFolderIdByName(
+                getWorkerService(), root["driveFolder"], workerCache
+            )
+            if rootDirId is None:
+                raise Exception(
+                    f"Could not find a unique Drive folder named '{root['driveFolder']}'."
+                )
+            us.downloadInputFiles(getWorkerService(), rootDirId, inputDir, workerCache)
+        else:
+            inputDir = root["localDir"]
+        accountant = aa.Accountant(inputDir, outputDir, **accountantOptions(root))
+        resultFilePathPublic = accountant.exportResults(
+            "scoringPublic", includeEmails=False
+        )
+        resultFilePath = accountant.exportResults("scoring", includeEmails=True)
+        summary["results"] = [resultFilePath, resultFilePathPublic]
+        if uploadsResults(root):
+            us.uploadResults(
+                getWorkerService(),
+                resultFilePath,
+                resultFilePathPublic,
+                root["scoringFolder"],
+                root["publicScoringFolder"],
+                workerCache,
+            )
+        summary["events"] = accountant.eventMap.__len__()
+        summary["registrants"] = accountant.userMap.__len__()
+    except Exception:
+        summary["status"] = "failed"
+        summary["error"] = traceback.format_exc()
+    summary["wallTime"] = time.perf_counter() - start
+    return summary
+
+
+def runBatch(roots, workDir=us.LOCAL_BASE_DIR, workers=None, rootUrl=None):
+    workers = workers or min(roots.__len__(), os.cpu_count() or 1)
+    summaries = dict()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max(1, workers), initializer=initWorker, initargs=(rootUrl,)
+    ) as pool:
+        futures = {pool.submit(scoreRoot, root, workDir): root for root in roots}
+        for future in concurrent.futures.as_completed(futures):
+            root = futures[future]
+            try:
+                summaries[root["name"]] = future.result()
+            except Exception:
+                # The worker itself died (e.g. ran out of memory)
+                summaries[root["name"]] = {
+                    "name": root["name"],
+                    "status": "failed",
+                    "events": None,
+                    "registrants": None,
+                    "results": list(),
+                    "error": traceback.format_exc(),
+                    "wallTime": None,
+                }
+    # Report in the order the roots were given
+    return [summaries[root["name"]] for root in roots]
+
+
+def formatCell(value, format="{}"):
+    if value is None:
+        return "-"
+    return format.format(value)
+
+
+def printSummary(summaries):
+    print("\n*** Batch summary ***")
+    print(f"{'root':<24}{'status':<8}{'events':>8}{'registrants':>13}{'seconds':>10}")
+    for summary in summaries:
+        print(
+            f"{summary['name']:<24}{summary['status']:<8}"
+            + f"{formatCell(summary['events']):>8}"
+            + f"{formatCell(summary['registrants']):>13}"
+            + f"{formatCell(summary['wallTime'], '{:.1f}'):>10}"
+        )
+    for summary in summaries:
+        if summary["error"]:
+            print(f"\n***Root {summary['name']} failed:\n{summary['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Score several organizations' activity points in one process."
+    )
+    parser.add_argument("config", help="JSON file listing the roots to score")
+    parser.add_argument("--work-dir", default=us.LOCAL_BASE_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--drive-root-url",
+        default=None,
+        help="Use this Drive server instead of Google (e.g. fakeDriveServer.py)",
+    )
+    args = parser.parse_args()
+    summaries = runBatch(
+        loadRoots(args.config), args.work_dir, args.workers, args.drive_root_url
+    )
+    printSummary(summaries)
+    if any(summary["status"] != "ok" for summary in summaries):
+        sys.exit(1)
@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import activityAccountant as aa
+import fakeDriveServer as fds
+import googleDriveClient as gd
+import updateScoresOnDrive as us
+
+# Runs updateScoresOnDrive end to end against a local fake Drive, so that
+# changes to the download/upload path can be measured (and regressions caught)
+# without credentials or network access.
+DEFAULT_INPUT_DIR = os.path.join(os.path.dirname(__file__), "..", "test")
+
+
+def seedDrive(drive, inputDir):
+    # Lay out the fake drive the way updateScoresOnDrive expects to find it
+    rootId = drive.addFolder(us.ROOT_DIR_NAME)
+    for subdir in [aa.REGISTRANT_SUBDIR, aa.EVENT_SUBDIR]:
+        drive.addDirectory(os.path.join(inputDir, subdir), rootId)
+    drive.addLocalFile(os.path.join(inputDir, aa.EMAIL_ALIAS_FILE), rootId)
+    drive.addFolder("scoring")
+    publicId = drive.addFolder("scoringPublic")
+    drive.addFile("latest.xlsx", publicId)
+
+
+def runOnce(inputDir, latency, bandwidth, maxPageSize):
+    with fds.FakeDriveServer(latency, bandwidth, maxPageSize) as drive:
+        seedDrive(drive, inputDir)
+        gdService = gd.createService(drive.rootUrl)
+        with tempfile.TemporaryDirectory() as localBaseDir:
+            start = time.perf_counter()
+            us.updateScores(gdService, localBaseDir=localBaseDir)
+            wallTime = time.perf_counter() - start
+        return {
+            "wallTime": wallTime,
+            "requestCount": drive.requestCount(),
+            "requestCounts": dict(drive.requestCounts),
+            "bytesReceived": drive.bytesReceived,
+            "bytesSent": drive.bytesSent,
+        }
+
+
+def printReport(results):
+    counts = results[-1]["requestCounts"]
+    print("\n*** Drive sync benchmark ***")
+    for kind in sorted(counts):
+        print(f"{kind:>20}: {counts[kind]}")
+    print(f"{'total requests':>20}: {results[-1]['requestCount']}")
+    print(f"{'bytes downloaded':>20}: {results[-1]['bytesSent']}")
+    print(f"{'bytes uploaded':>20}: {results[-1]['bytesReceived']}")
+    wallTimes = sorted(result["wallTime"] for result in results)
+    print(
+        f"{'wall time':>20}: min {wallTimes[0]:.3f}s, "
+        + f"median {wallTimes[len(wallTimes) // 2]:.3f}s over {len(wallTimes)} run(s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time updateScoresOnDrive against a local fake Drive."
+    )
+    parser.add_argument("--input-dir", default=DEFAULT_INPUT_DIR)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Per-request latency, in seconds"
+    )
+    parser.add_argument(
+        "--bandwidth", type=float, default=None, help="Bytes per second"
+    )
+    parser.add_argument("--max-page-size", type=int, default=fds.MAX_PAGE_SIZE)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=None,
+        help="Exit non-zero if a run makes more Drive requests than this",
+    )
+    args = parser.parse_args()
+    results = [
+        runOnce(args.input_dir, args.latency, args.bandwidth, args.max_page_size)
+        for it in range(0, args.repeat)
+    ]
+    printReport(results)
+    requestCount = results[-1]["requestCount"]
+    if args.max_requests is not None and requestCount > args.max_requests:
+        print(
+            f"***Drive request count {requestCount} exceeds the limit of {args.max_requests}."
+        )
+        sys.exit(1)
@@ -0,0 +1,394 @@
+import email.parser
+import email.policy
+import http.server
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+XLSX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# Drive never returns more than this many files in one page
+MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_SIZE = 100
+
+# The query clauses our client actually sends. Anything else gets a 400, so
+# that a client change relying on unsupported syntax fails loudly.
+PARENT_CLAUSE = re.compile(r"^'([^']*)' in parents$")
+FIELD_CLAUSE = re.compile(r"^(name|mimeType) (=|!=) '([^']*)'$")
+
+
+class FakeDriveServer:
+    # A local, in-memory stand-in for the parts of the Drive v3 REST API used
+    # by googleDriveClient.py: files.list (with pagination), files.get (with
+    # alt=media), and files.create/files.update (metadata, multipart and
+    # resumable uploads). Point the client at it with
+    # googleDriveClient.createService(server.rootUrl), or by setting
+    # GOOGLE_DRIVE_ROOT_URL.
+    #
+    # latency is added to every request, in seconds. bandwidth, in bytes per
+    # second, throttles request and response bodies; None means unlimited.
+    # maxPageSize caps the page size the server will honor, which is useful to
+    # force clients through pagination.
+    def __init__(
+        self,
+        latency=0.0,
+        bandwidth=None,
+        maxPageSize=MAX_PAGE_SIZE,
+        host="127.0.0.1",
+        port=0,
+    ):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.maxPageSize = maxPageSize
+        self.files = dict()
+        self.uploadSessions = dict()
+        self.lock = threading.Lock()
+        self.nextId = 1
+        self.resetStats()
+        self.httpServer = http.server.ThreadingHTTPServer(
+            (host, port), _makeHandler(self)
+        )
+        self.thread = None
+
+    @property
+    def rootUrl(self):
+        host, port = self.httpServer.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.httpServer.serve_forever, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpServer.shutdown()
+        self.httpServer.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def resetStats(self):
+        self.requestCounts = dict()
+        self.bytesReceived = 0
+        self.bytesSent = 0
+
+    def requestCount(self):
+        return sum(self.requestCounts.values())
+
+    def addFile(self, name, parentId=None, content=b"", mimeType=XLSX_MIME_TYPE):
+        with self.lock:
+            fileId = f"fake{self.nextId:06d}"
+            self.nextId += 1
+            self.files[fileId] = {
+                "id": fileId,
+                "name": name,
+                "mimeType": mimeType,
+                "parents": [parentId] if parentId else [],
+                "content": content,
+            }
+        return fileId
+
+    def addFolder(self, name, parentId=None):
+        return self.addFile(name, parentId, mimeType=FOLDER_MIME_TYPE)
+
+    def addDirectory(self, localDir, parentId=None, name=None):
+        # Mirror a local directory tree into the fake drive. Spreadsheets get
+        # the xlsx mime type; everything else is stored as plain bytes.
+        folderId = self.addFolder(name or os.path.basename(localDir), parentId)
+        for entry in sorted(os.listdir(localDir)):
+            path = os.path.join(localDir, entry)
+            if os.path.isdir(path):
+                self.addDirectory(path, folderId)
+            else:
+                self.addLocalFile(path, folderId)
+        return folderId
+
+    def addLocalFile(self, localPath, parentId=None, name=None):
+        with open(localPath, "rb") as f:
+            content = f.read()
+        mimeType = XLSX_MIME_TYPE
+        if not localPath.endswith(".xlsx"):
+            mimeType = "application/octet-stream"
+        return self.addFile(
+            name or os.path.basename(localPath), parentId, content, mimeType
+        )
+
+    def findFiles(self, name, parentId=None):
+        with self.lock:
+            return [
+                item
+                for item in self.files.values()
+                if item["name"] == name
+                and (parentId is None or parentId in item["parents"])
+            ]
+
+    def matchesQuery(self, item, query):
+        if not query:
+            return True
+        for clause in query.split(" and "):
+            clause = clause.strip()
+            match = PARENT_CLAUSE.match(clause)
+            if match:
+                if match.group(1) not in item["parents"]:
+                    return False
+                continue
+            match = FIELD_CLAUSE.match(clause)
+            if match:
+                field, op, value = match.groups()
+                if (item[field] == value) != (op == "="):
+                    return False
+                continue
+            raise ValueError(f"Unsupported query clause: {clause}")
+        return True
+
+
+def _metadata(item):
+    return {
+        "kind": "drive#file",
+        "id": item["id"],
+        "name": item["name"],
+        "mimeType": item["mimeType"],
+        "parents": list(item["parents"]),
+    }
+
+
+def _makeHandler(drive):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def throttle(self, byteCount):
+            if drive.bandwidth and byteCount:
+                time.sleep(byteCount / drive.bandwidth)
+
+        def begin(self, kind):
+            time.sleep(drive.latency)
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length) if length else b""
+            self.throttle(len(body))
+            with drive.lock:
+                drive.requestCounts[kind] = drive.requestCounts.get(kind, 0) + 1
+                drive.bytesReceived += len(body)
+            return body
+
+        def send(self, status, body=b"", headers=None):
+            self.throttle(len(body))
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with drive.lock:
+                drive.bytesSent += len(body)
+
+        def sendJson(self, status, payload, headers=None):
+            headers = dict(headers or {})
+            headers["Content-Type"] = "application/json"
+            self.send(status, json.dumps(payload).encode(), headers)
+
+        def sendError(self, status, message):
+            self.sendJson(
+                status, {"error": {"code": status, "message": message, "errors": []}}
+            )
+
+        def parse(self):
+            url = urllib.parse.urlparse(self.path)
+            params = {
+                key: values[-1]
+                for key, values in urllib.parse.parse_qs(url.query).items()
+            }
+            return url.path, params
+
+        def getFile(self, fileId):
+            item = drive.files.get(fileId)
+            if item is None:
+                self.sendError(404, f"File not found: {fileId}.")
+            return item
+
+        def do_GET(self):
+            path, params = self.parse()
+            if path == "/drive/v3/files":
+                self.begin("files.list")
+                self.listFiles(params)
+                return
+            match = re.fullmatch(r"/drive/v3/files/([^/]+)", path)
+            if match and params.get("alt") == "media":
+                self.begin("files.get_media")
+                item = self.getFile(match.group(1))
+                if item is not None:
+                    self.sendMedia(item["content"])
+                return
+            if match:
+                self.begin("files.get")
+                item = self.getFile(match.group(1))
+                if item is not None:
+                    self.sendJson(200, _metadata(item))
+                return
+            self.begin("unknown")
+            self.sendError(404, f"Unknown path {path}")
+
+        def listFiles(self, params):
+            try:
+                with drive.lock:
+                    matches = [
+                        item
+                        for item in drive.files.values()
+                        if drive.matchesQuery(item, params.get("q"))
+                    ]
+            except ValueError as error:
+                self.sendError(400, str(error))
+                return
+            pageSize = int(params.get("pageSize", DEFAULT_PAGE_SIZE))
+            pageSize = max(1, min(pageSize, drive.maxPageSize))
+            start = int(params.get("pageToken", 0))
+            result = {
+                "kind": "drive#fileList",
+                "files": [_metadata(item) for item in matches[start : start + pageSize]],
+            }
+            if start + pageSize < len(matches):
+                result["nextPageToken"] = str(start + pageSize)
+            self.sendJson(200, result)
+
+        def sendMedia(self, content):
+            # The client downloads in chunks using Range headers
+            match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            if not match:
+                self.send(200, content, {"Content-Type": "application/octet-stream"})
+                return
+            first = int(match.group(1))
+            last = len(content) - 1
+            if match.group(2):
+                last = min(last, int(match.group(2)))
+            self.send(
+                206,
+                content[first : last + 1],
+                {
+                    "Content-Type": "application/octet-stream",
+                    "Content-Range": f"bytes {first}-{last}/{len(content)}",
+                },
+            )
+
+        def do_POST(self):
+            path, params = self.parse()
+            if path == "/drive/v3/files":
+                body = self.begin("files.create")
+                self.createFile(json.loads(body or b"{}"), None)
+            elif path == "/upload/drive/v3/files":
+                body = self.begin("files.create")
+                self.upload(params, body, None)
+            else:
+                self.begin("unknown")
+                self.sendError(404, f"Unknown path {path}")
+
+        def do_PATCH(self):
+            path, params = self.parse()
+            match = re.fullmatch(r"/(upload/)?drive/v3/files/([^/]+)", path)
+            if not match:
+                self.begin("unknown")
+                self.sendError(404, f"Unknown path {path}")
+                return
+            body = self.begin("files.update")
+            item = self.getFile(match.group(2))
+            if item is None:
+                return
+            if match.group(1):
+                self.upload(params, body, item)
+            else:
+                self.updateFile(item, json.loads(body or b"{}"), None)
+
+        def do_PUT(self):
+            path, params = self.parse()
+            body = self.begin("upload.chunk")
+            session = drive.uploadSessions.get(params.get("upload_id"))
+            if path != "/upload/session" or session is None:
+                self.sendError(404, "Unknown upload session.")
+                return
+            session["content"] += body
+            contentRange = self.headers.get("Content-Range", "")
+            match = re.fullmatch(r"bytes (?:\d+-\d+|\*)/(\d+|\*)", contentRange)
+            total = match.group(1) if match else str(len(session["content"]))
+            if total == "*" or len(session["content"]) < int(total):
+                # More chunks to come
+                headers = {}
+                if session["content"]:
+                    headers["Range"] = f"bytes=0-{len(session['content']) - 1}"
+                self.send(308, b"", headers)
+                return
+            del drive.uploadSessions[params["upload_id"]]
+            if session["item"] is None:
+                self.createFile(session["metadata"], session["content"])
+            else:
+                self.updateFile(session["item"], session["metadata"], session["content"])
+
+        def upload(self, params, body, item):
+            uploadType = params.get("uploadType")
+            if uploadType == "resumable":
+                with drive.lock:
+                    uploadId = f"upload{drive.nextId:06d}"
+                    drive.nextId += 1
+                    drive.uploadSessions[uploadId] = {
+                        "item": item,
+                        "metadata": json.loads(body or b"{}"),
+                        "content": b"",
+                    }
+                self.send(
+                    200,
+                    b"",
+                    {"Location": f"{drive.rootUrl}upload/session?upload_id={uploadId}"},
+                )
+                return
+            if uploadType == "multipart":
+                metadata, content = self.parseMultipart(body)
+            elif uploadType == "media":
+                metadata, content = {}, body
+            else:
+                self.sendError(400, f"Unsupported uploadType {uploadType}")
+                return
+            if item is None:
+                self.createFile(metadata, content)
+            else:
+                self.updateFile(item, metadata, content)
+
+        def parseMultipart(self, body):
+            header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+            message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                header + body
+            )
+            parts = list(message.iter_parts())
+            metadata = json.loads(parts[0].get_content() or "{}")
+            content = parts[1].get_payload(decode=True) if len(parts) > 1 else b""
+            return metadata, content
+
+        def createFile(self, metadata, content):
+            parents = metadata.get("parents") or [None]
+            fileId = drive.addFile(
+                metadata.get("name", "Untitled"),
+                parents[0],
+                content or b"",
+                metadata.get("mimeType", XLSX_MIME_TYPE),
+            )
+            self.sendJson(200, {"id": fileId})
+
+        def updateFile(self, item, metadata, content):
+            with drive.lock:
+                if "name" in metadata:
+                    item["name"] = metadata["name"]
+                if content is not None:
+                    item["content"] = content
+            self.sendJson(200, {"id": item["id"]})
+
+    return Handler
@@ -3,18 +3,35 @@ import os.path
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient import discovery_cache
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 from google.oauth2 import service_account
 from apiclient import http
+import httplib2
+import json
 import logging
 import io
 
-CREDSFILE = os.environ["GOOGLE_APPLICATION_CREDENTIALS"]
+CREDSFILE = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+# If set, point the client at a different Drive v3 server (e.g. the local
+# stand-in in fakeDriveServer.py) instead of Google. No credentials are sent.
+ROOT_URL = os.environ.get("GOOGLE_DRIVE_ROOT_URL")
 
 
-def createService():
+def createService(rootUrl=None):
+    rootUrl = rootUrl or ROOT_URL
+    if rootUrl:
+        # Rewrite the root of the bundled discovery document rather than using
+        # client_options, which would leave uploads pointed at https.
+        document = json.loads(discovery_cache.get_static_doc("drive", "v3"))
+        document["rootUrl"] = rootUrl
+        return build_from_document(document, http=httplib2.Http())
+    if not CREDSFILE:
+        raise Exception(
+            "GOOGLE_APPLICATION_CREDENTIALS must be set to a credentials file to use Google Drive."
+        )
     return build(
         "drive",
         "v3",
@@ -22,20 +39,41 @@ def createService():
     )
 
 
-def getChildId(service, parentId, childName):
+def listChildren(service, parentId):
+    # List everything in a folder, following nextPageToken until Drive has
+    # returned every page.
     q = "'" + parentId + "' in parents"
-    results = (
-        service.files()
-        .list(
-            pageSize=1000,
-            q=q,
-            fields="nextPageToken, files(id, name, mimeType)",
-            includeItemsFromAllDrives=True,
-            supportsAllDrives=True,
+    children = list()
+    pageToken = None
+    while True:
+        results = (
+            service.files()
+            .list(
+                pageSize=1000,
+                q=q,
+                fields="nextPageToken, files(id, name, mimeType)",
+                includeItemsFromAllDrives=True,
+                supportsAllDrives=True,
+                pageToken=pageToken,
+            )
+            .execute()
         )
-        .execute()
-    )
-    folder = results.get("files", [])
+        logging.debug(results)
+        children.extend(results.get("files", []))
+        pageToken = results.get("nextPageToken")
+        if not pageToken:
+            return children
+
+
+def getChildId(service, parentId, childName, cache=None):
+    # cache, if given, is a dict that remembers folder listings between calls
+    # so repeated lookups in the same folder don't go back to Drive.
+    if cache is not None and ("children", parentId) in cache:
+        folder = cache[("children", parentId)]
+    else:
+        folder = listChildren(service, parentId)
+        if cache is not None:
+            cache[("children", parentId)] = folder
     for item in folder:
         if item["name"] == childName:
             return item["id"]
@@ -68,20 +106,7 @@ def downloadExcelDirectory(service, fileId, des, ignoreNames=[], recursive=True)
 
     #     var q = "mimeType = 'application/vnd.google-apps.folder' and '"+folderId+"' in parents";
     # var children = Drive.Files.list({q:q});
-    q = "'" + fileId + "' in parents"
-    results = (
-        service.files()
-        .list(
-            pageSize=1000,
-            q=q,
-            fields="nextPageToken, files(id, name, mimeType)",
-            includeItemsFromAllDrives=True,
-            supportsAllDrives=True,
-        )
-        .execute()
-    )
-    logging.debug(results)
-    folder = results.get("files", [])
+    folder = listChildren(service, fileId)
     logging.debug(folder)
     if not os.path.isdir(des):
         os.makedirs(des, exist_ok=True)
@@ -171,7 +196,9 @@ def main():
         print(f"An error occurred: {error}")
 
 
-def getFolderIdByName(service, name):
+def getFolderIdByName(service, name, cache=None):
+    if cache is not None and ("folder", name) in cache:
+        return cache[("folder", name)]
     # Call the Drive v3 API
     folderList = (
         service.files()
@@ -197,10 +224,15 @@ def getFolderIdByName(service, name):
             + "' folders shared with this user. Check sharing and try again."
         )
         return
+    if cache is not None:
+        cache[("folder", name)] = items[0]["id"]
     return items[0]["id"]
 
 
-def uploadSpreadsheet(service, parentFolderId, localPath):
+def uploadSpreadsheet(service, parentFolderId, localPath, cache=None):
+    if cache is not None:
+        # The folder is about to change, so forget what we knew about it
+        cache.pop(("children", parentFolderId), None)
     try:
         file_metadata = {
             "name": os.path.split(localPath)[-1],
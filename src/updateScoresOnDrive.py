@@ -3,8 +3,13 @@ import activityAccountant as aa
 import os
 import shutil
 
+ROOT_DIR_NAME = "ActivityAccounting"
+SCORING_DIR_NAME = "scoring"
+PUBLIC_SCORING_DIR_NAME = "scoringPublic"
+LOCAL_BASE_DIR = "/tmp/activityAccountant"
 
-def downloadInputFiles(gdService, rootDirId, localInputDir):
+
+def downloadInputFiles(gdService, rootDirId, localInputDir, cache=None):
     # Download the registrant subdir
     gd.downloadExcelDirectory(
         gdService,
@@ -12,6 +17,7 @@ def downloadInputFiles(gdService, rootDirId, localInputDir):
             gdService,
             rootDirId,
             aa.REGISTRANT_SUBDIR,
+            cache,
         ),
         os.path.join(localInputDir, aa.REGISTRANT_SUBDIR),
     )
@@ -22,53 +28,95 @@ def downloadInputFiles(gdService, rootDirId, localInputDir):
             gdService,
             rootDirId,
             aa.EVENT_SUBDIR,
+            cache,
         ),
         os.path.join(localInputDir, aa.EVENT_SUBDIR),
     )
     # Download the aliases file
     gd.downloadExcel(
         gdService,
-        fileId=gd.getChildId(gdService, rootDirId, aa.EMAIL_ALIAS_FILE),
+        fileId=gd.getChildId(gdService, rootDirId, aa.EMAIL_ALIAS_FILE, cache),
         fileName=aa.EMAIL_ALIAS_FILE,
         destDir=localInputDir,
     )
 
 
-if __name__ == "__main__":
-    # Create the google service and download all hte files we need
-    gdService = gd.createService()
-    localInputDir = "/tmp/activityAccountant/input"
+def uploadResults(
+    gdService,
+    resultFilePath,
+    resultFilePathPublic,
+    scoringDirName=SCORING_DIR_NAME,
+    publicScoringDirName=PUBLIC_SCORING_DIR_NAME,
+    cache=None,
+):
+    # Look up every destination before uploading anything, so a missing
+    # folder doesn't leave the results half delivered
+    scoresFolderId = gd.getFolderIdByName(gdService, scoringDirName, cache)
+    publicScoresFolderId = gd.getFolderIdByName(gdService, publicScoringDirName, cache)
+    for folderName, folderId in [
+        (scoringDirName, scoresFolderId),
+        (publicScoringDirName, publicScoresFolderId),
+    ]:
+        if folderId is None:
+            raise Exception(f"Could not find a unique Drive folder named '{folderName}'.")
+    latestFileId = gd.getChildId(gdService, publicScoresFolderId, "latest.xlsx", cache)
+    if latestFileId is None:
+        raise Exception(f"Drive folder '{publicScoringDirName}' has no latest.xlsx.")
+    for folderId, localPath in [
+        (scoresFolderId, resultFilePath),
+        (publicScoresFolderId, resultFilePathPublic),
+    ]:
+        if gd.uploadSpreadsheet(gdService, folderId, localPath, cache) is None:
+            raise Exception(f"Failed to upload {localPath} to Drive.")
+    gd.updateSpreadsheet(
+        gdService,
+        latestFileId,
+        resultFilePathPublic,
+        "latest.xlsx",
+    )
+
+
+def updateScores(
+    gdService,
+    rootDirName=ROOT_DIR_NAME,
+    localBaseDir=LOCAL_BASE_DIR,
+    scoringDirName=SCORING_DIR_NAME,
+    publicScoringDirName=PUBLIC_SCORING_DIR_NAME,
+    cache=None,
+    **accountantOptions,
+):
+    # Download all the files we need
+    localInputDir = os.path.join(localBaseDir, "input")
     if os.path.isdir(localInputDir):
         shutil.rmtree(localInputDir)
-    rootDirId = gd.getFolderIdByName(gdService, "ActivityAccounting")
+    rootDirId = gd.getFolderIdByName(gdService, rootDirName, cache)
+    if rootDirId is None:
+        raise Exception(f"Could not find a unique Drive folder named '{rootDirName}'.")
     # Download input files
-    downloadInputFiles(gdService, rootDirId, localInputDir)
+    downloadInputFiles(gdService, rootDirId, localInputDir, cache)
     # Delete the old output dir
-    localOutputDir = "/tmp/activityAccountant/results"
+    localOutputDir = os.path.join(localBaseDir, "results")
     if os.path.isdir(localOutputDir):
         shutil.rmtree(localOutputDir)
     # Create the accountant - this is where the magic happens
-    accountant = aa.Accountant(localInputDir, localOutputDir)
+    accountant = aa.Accountant(localInputDir, localOutputDir, **accountantOptions)
     # Export the results
     resultFilePathPublic = accountant.exportResults(
         "scoringPublic", includeEmails=False
     )
     resultFilePath = accountant.exportResults("scoring", includeEmails=True)
     # Upload the results to drive
-    gd.uploadSpreadsheet(
+    uploadResults(
         gdService,
-        gd.getFolderIdByName(gdService, "scoring"),
         resultFilePath,
-    )
-    publicScoresFolderId = gd.getFolderIdByName(gdService, "scoringPublic")
-    gd.uploadSpreadsheet(
-        gdService,
-        publicScoresFolderId,
         resultFilePathPublic,
+        scoringDirName,
+        publicScoringDirName,
+        cache,
     )
-    gd.updateSpreadsheet(
-        gdService,
-        gd.getChildId(gdService, publicScoresFolderId, "latest.xlsx"),
-        resultFilePathPublic,
-        "latest.xlsx",
-    )
+    return accountant
+
+
+if __name__ == "__main__":
+    # Create the google service and recalculate everything
+    updateScores(gd.createService())
@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import batchUpdateScores as bu
+import fakeDriveServer as fds
+
+TEST_DIR = os.path.dirname(__file__)
+
+
+def writeConfig(tmp_path, roots):
+    configPath = tmp_path / "roots.json"
+    configPath.write_text(json.dumps(roots))
+    return str(configPath)
+
+
+def test_runBatchIsolatesFailures(tmp_path):
+    roots = [
+        {
+            "name": "good",
+            "localDir": TEST_DIR,
+            "scoringFolder": "goodScoring",
+            "publicScoringFolder": "goodScoringPublic",
+        },
+        {
+            "name": "typo",
+            "localDir": TEST_DIR,
+            "scoringFolder": "Typo",
+            "publicScoringFolder": "typoScoringPublic",
+        },
+        {"name": "missing", "localDir": str(tmp_path / "doesNotExist")},
+    ]
+    with fds.FakeDriveServer() as drive:
+        goodScoringId = drive.addFolder("goodScoring")
+        goodPublicId = drive.addFolder("goodScoringPublic")
+        drive.addFile("latest.xlsx", goodPublicId, b"old")
+        typoPublicId = drive.addFolder("typoScoringPublic")
+        drive.addFile("latest.xlsx", typoPublicId, b"old")
+
+        summaries = bu.runBatch(
+            bu.loadRoots(writeConfig(tmp_path, roots)),
+            str(tmp_path / "work"),
+            workers=2,
+            rootUrl=drive.rootUrl,
+        )
+
+        assert [summary["name"] for summary in summaries] == ["good", "typo", "missing"]
+        assert [summary["status"] for summary in summaries] == ["ok", "failed", "failed"]
+        assert summaries[0]["registrants"] > 0
+        assert "Typo" in summaries[1]["error"]
+        # The good root delivered both files and replaced latest.xlsx
+        goodFiles = [
+            item for item in drive.files.values() if goodScoringId in item["parents"]
+        ]
+        assert [item["name"].endswith("_scoring.xlsx") for item in goodFiles] == [True]
+        latest = drive.findFiles("latest.xlsx", goodPublicId)[0]
+        assert latest["content"] != b"old"
+        # The root with a missing folder uploaded nothing at all
+        typoFiles = [
+            item for item in drive.files.values() if typoPublicId in item["parents"]
+        ]
+        assert [item["name"] for item in typoFiles] == ["latest.xlsx"]
+        assert typoFiles[0]["content"] == b"old"
+        orphans = [item for item in drive.files.values() if not item["parents"]]
+        assert all(item["mimeType"] == fds.FOLDER_MIME_TYPE for item in orphans)
+
+
+@pytest.mark.parametrize(
+    "roots, message",
+    [
+        (
+            [
+                {"name": "a", "localDir": "a", "outputDir": "out"},
+                {"name": "b", "localDir": "b", "outputDir": "./out"},
+            ],
+            "both write to output dir",
+        ),
+        (
+            [{"name": "a", "driveFolder": "A", "scoringFolder": "aScoring"}],
+            "must set 'publicScoringFolder'",
+        ),
+        (
+            [
+                {
+                    "name": "a",
+                    "driveFolder": "A",
+                    "scoringFolder": "aScoring",
+                    "publicScoringFolder": "sharedPublic",
+                },
+                {
+                    "name": "b",
+                    "driveFolder": "B",
+                    "scoringFolder": "bScoring",
+                    "publicScoringFolder": "sharedPublic",
+                },
+            ],
+            "both write to Drive folder",
+        ),
+        ([{"name": "../x", "localDir": "x"}], "plain directory name"),
+        ([{"name": "/data", "localDir": "x"}], "plain directory name"),
+    ],
+)
+def test_loadRootsRejectsBadConfig(tmp_path, roots, message):
+    with pytest.raises(Exception, match=message):
+        bu.loadRoots(writeConfig(tmp_path, roots))
@@ -0,0 +1,59 @@
+import os
+import shutil
+import sys
+
+import openpyxl
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import activityAccountant as aa
+
+TEST_DIR = os.path.dirname(__file__)
+REGISTRANT_FILE = "SundayEventFilenameDoesNotMatter.xlsx"
+
+
+def snapshot(accountant):
+    # Everything that ends up in the results, keyed by registrant
+    return {
+        email: (
+            user.firstName,
+            user.lastName,
+            user.email,
+            user.id,
+            user.points,
+            user.eventMultipliers,
+            user.sourceEventDate,
+        )
+        for email, user in accountant.userMap.items()
+    }
+
+
+def checkChunkedMatchesFullLoad(inputDir, outputDir):
+    expected = snapshot(aa.Accountant(inputDir, outputDir))
+    assert expected
+    for chunkSize in [1, 2, 7, 1000]:
+        chunked = aa.Accountant(inputDir, outputDir, chunkSize=chunkSize)
+        assert snapshot(chunked) == expected, f"chunkSize={chunkSize}"
+    return expected
+
+
+def test_chunkedMatchesFullLoad(tmp_path):
+    checkChunkedMatchesFullLoad(TEST_DIR, str(tmp_path / "results"))
+
+
+def test_chunkedKeepsNumericLookingText(tmp_path):
+    # A text cell that looks like a number must survive both paths untouched,
+    # even when it is alone in its chunk.
+    inputDir = tmp_path / "input"
+    shutil.copytree(TEST_DIR, inputDir, ignore=shutil.ignore_patterns("*.py"))
+    path = inputDir / aa.REGISTRANT_SUBDIR / REGISTRANT_FILE
+    workbook = openpyxl.load_workbook(path)
+    sheet = workbook.worksheets[0]
+    header = [cell.value for cell in sheet[1]]
+    lastNameColumn = header.index("Last Name") + 1
+    sheet.cell(row=sheet.max_row, column=lastNameColumn).value = "0042"
+    email = sheet.cell(row=sheet.max_row, column=header.index("Email") + 1).value
+    workbook.save(path)
+
+    expected = checkChunkedMatchesFullLoad(str(inputDir), str(tmp_path / "results"))
+    assert expected[email.strip().lower()][1] == "0042"
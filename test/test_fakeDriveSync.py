@@ -0,0 +1,41 @@
+import io
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import benchmarkDriveSync as bds
+import fakeDriveServer as fds
+import googleDriveClient as gd
+import updateScoresOnDrive as us
+
+TEST_DIR = os.path.dirname(__file__)
+# What a full sync of the test data costs with two files per listing page.
+# Raise this only for a deliberate change to the Drive I/O path.
+MAX_REQUESTS = 21
+
+
+def test_updateScoresAgainstFakeDrive(tmp_path):
+    # A small page size forces every folder listing through pagination
+    with fds.FakeDriveServer(maxPageSize=2) as drive:
+        bds.seedDrive(drive, TEST_DIR)
+        gdService = gd.createService(drive.rootUrl)
+        accountant = us.updateScores(gdService, localBaseDir=str(tmp_path))
+
+        scoringId = drive.findFiles(us.SCORING_DIR_NAME)[0]["id"]
+        publicId = drive.findFiles(us.PUBLIC_SCORING_DIR_NAME)[0]["id"]
+        scoring = [item for item in drive.files.values() if scoringId in item["parents"]]
+        public = [item for item in drive.files.values() if publicId in item["parents"]]
+        assert [item["name"].endswith("_scoring.xlsx") for item in scoring] == [True]
+        assert sorted(item["name"].endswith("_scoringPublic.xlsx") for item in public) == [
+            False,
+            True,
+        ]
+        # latest.xlsx was seeded empty, and now holds the public scores
+        latest = drive.findFiles("latest.xlsx", publicId)[0]
+        scores = pd.read_excel(io.BytesIO(latest["content"]))
+        assert scores.__len__() == accountant.userMap.__len__() > 0
+        assert "Email" not in scores.columns
+
+        assert drive.requestCount() <= MAX_REQUESTS, drive.requestCounts